@@ -1,11 +1,16 @@
 # sleeper_trades.py
 import asyncio
+import atexit
 import httpx
-import json
+import orjson
 import os
+import time
 import logging
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from operator import itemgetter
 from pathlib import Path
-from typing import Optional, List, Dict, Any, Tuple
+from typing import Optional, List, Dict, Any, Tuple, FrozenSet, Callable, Awaitable, Hashable, AsyncIterator
 from datetime import datetime, timezone
 from async_lru import alru_cache
 
@@ -16,19 +21,109 @@ BASE_URL = "https://api.sleeper.app/v1"
 CACHE_DIR = Path(os.getenv("SLEEPER_CACHE_DIR", ".sleeper_cache"))
 CACHE_DIR.mkdir(parents=True, exist_ok=True)
 PLAYERS_FILE = CACHE_DIR / "players_nfl.json"
+# Sleeper asks clients to fetch /players/nfl at most once a day
+PLAYERS_MAX_AGE = int(os.getenv("SLEEPER_PLAYERS_MAX_AGE", "86400"))
+_players_refresh_task: Optional[asyncio.Task] = None
+
+# transaction types treated as trades (None: some payloads omit the type)
+TRADE_TYPES: FrozenSet[Optional[str]] = frozenset({None, "trade", "trade_proposal", "trade_transaction"})
 
 # limit concurrency so we don't hammer the public API
 MAX_CONCURRENT = int(os.getenv("SLEEPER_MAX_CONCURRENT", "8"))
 _semaphore = asyncio.Semaphore(MAX_CONCURRENT)
-
-
-async def _safe_get(client: httpx.AsyncClient, url: str) -> Optional[Any]:
-    """GET a URL and return parsed JSON or None on error."""
+# and stay under Sleeper's rate limit (~1000 calls/minute); normal fan-outs never hit this
+MAX_PER_MINUTE = int(os.getenv("SLEEPER_MAX_PER_MINUTE", "900"))
+# leagues processed at once per gather_trades call
+MAX_CONCURRENT_LEAGUES = int(os.getenv("SLEEPER_MAX_CONCURRENT_LEAGUES", "8"))
+
+# shared client so keep-alive connections / TLS sessions are reused across calls
+_CLIENT: Optional[httpx.AsyncClient] = None
+
+
+async def get_client() -> httpx.AsyncClient:
+    """Return the shared AsyncClient, creating it on first use."""
+    global _CLIENT
+    if _CLIENT is None or _CLIENT.is_closed:
+        _CLIENT = httpx.AsyncClient(
+            http2=True,
+            limits=httpx.Limits(max_connections=64, max_keepalive_connections=32),
+            timeout=20.0,
+        )
+    return _CLIENT
+
+
+async def close_client() -> None:
+    """Close the shared AsyncClient (call on app shutdown)."""
+    global _CLIENT
+    if _CLIENT is not None:
+        await _CLIENT.aclose()
+        _CLIENT = None
+
+
+class RateLimiter:
+    """Sliding-window limiter: at most `rate` acquisitions per `period` seconds, granted FIFO."""
+
+    def __init__(self, rate: int, period: float = 1.0):
+        self.rate = rate
+        self.period = period
+        self._stamps: deque = deque()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        # the lock queues waiters in arrival order, so no caller gets starved
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                while self._stamps and now - self._stamps[0] >= self.period:
+                    self._stamps.popleft()
+                if len(self._stamps) < self.rate:
+                    self._stamps.append(now)
+                    return
+                await asyncio.sleep(self.period - (now - self._stamps[0]))
+
+
+_rate_limiter = RateLimiter(MAX_PER_MINUTE, period=60.0)
+
+
+@asynccontextmanager
+async def _request_slot() -> AsyncIterator[None]:
+    """Hold one in-flight slot and one rate-limit credit for the duration of a request."""
+    async with _semaphore:
+        await _rate_limiter.acquire()
+        yield
+
+
+async def _safe_get(client: Optional[httpx.AsyncClient], url: str) -> Optional[Any]:
+    """GET a URL and return parsed JSON or None on error (uses shared client if none given)."""
+    if client is None:
+        client = await get_client()
     try:
-        async with _semaphore:
+        async with _request_slot():
             resp = await client.get(url, timeout=20.0)
         resp.raise_for_status()
-        return resp.json()
+        # parse the raw bytes directly, skipping the intermediate str decode
+        return orjson.loads(resp.content)
+    except httpx.HTTPStatusError as e:
+        LOG.warning("HTTP error for %s: %s", url, e)
+    except Exception as e:
+        LOG.warning("Error fetching %s: %s", url, e)
+    return None
+
+
+async def _fetch_players_streaming(client: httpx.AsyncClient) -> Optional[bytearray]:
+    """
+    Stream the (multi-MB) /players/nfl body into a single buffer and return it, or None on error.
+    Avoids httpx's buffered content + str decode; the caller parses/saves the raw bytes.
+    """
+    url = f"{BASE_URL}/players/nfl"
+    try:
+        async with _request_slot():
+            async with client.stream("GET", url, timeout=60.0) as resp:
+                resp.raise_for_status()
+                buf = bytearray()
+                async for chunk in resp.aiter_bytes():
+                    buf += chunk
+        return buf
     except httpx.HTTPStatusError as e:
         LOG.warning("HTTP error for %s: %s", url, e)
     except Exception as e:
@@ -36,108 +131,184 @@ async def _safe_get(client: httpx.AsyncClient, url: str) -> Optional[Any]:
     return None
 
 
-def _iso_from_maybe_ts(val: Any) -> Optional[str]:
-    """Convert various date representations to ISO strings (UTC)."""
+def _ts_to_iso(ms: int) -> str:
+    """Epoch milliseconds -> ISO string (UTC)."""
+    try:
+        return datetime.fromtimestamp(ms / 1000.0, tz=timezone.utc).isoformat()
+    except (OverflowError, OSError, ValueError):
+        return str(ms)
+
+
+def _epoch_ms_from_maybe_ts(val: Any) -> Optional[int]:
+    """Convert various date representations to epoch ms (UTC); None if not a recognisable date."""
     if val is None:
         return None
-    # numeric epoch ms
+    # Sleeper almost always sends epoch ms ints
+    if type(val) is int:
+        return val
+    if isinstance(val, (int, float)):
+        try:
+            return int(val)
+        except (OverflowError, ValueError):
+            return None
+    s = val if type(val) is str else str(val)
+    # int-like strings (isdigit alone also accepts e.g. superscripts, which int() rejects)
+    if s.isascii() and s.isdigit():
+        return int(s)
+    # ISO-like strings
     try:
-        if isinstance(val, (int, float)):
-            # Sleeper often uses milliseconds
-            t = float(val) / 1000.0
-            return datetime.fromtimestamp(t, tz=timezone.utc).isoformat()
-        s = str(val)
-        # try parse int-like strings
-        if s.isdigit():
-            t = float(int(s)) / 1000.0
-            return datetime.fromtimestamp(t, tz=timezone.utc).isoformat()
-        # try ISO-like strings
+        dt = datetime.fromisoformat(s)
+    except ValueError:
+        return None
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return int(dt.timestamp() * 1000)
+
+
+def _iso_from_ms(ms: Optional[int], val: Any) -> Optional[str]:
+    """ISO string (UTC) for already-parsed epoch ms; falls back to the original value as a string."""
+    if ms is not None:
+        return _ts_to_iso(ms)
+    return None if val is None else str(val)
+
+
+async def _download_players() -> Optional[Dict[str, Any]]:
+    """Fetch players from Sleeper and atomically replace the file cache. Returns None on failure."""
+    client = await get_client()
+    raw = await _fetch_players_streaming(client)
+    data = None
+    if raw:
         try:
-            dt = datetime.fromisoformat(s)
-            if dt.tzinfo is None:
-                dt = dt.replace(tzinfo=timezone.utc)
-            return dt.isoformat()
-        except Exception:
-            # fallback: return original string
-            return s
-    except Exception:
-        return str(val)
+            data = orjson.loads(raw)
+        except orjson.JSONDecodeError as e:
+            LOG.warning("Invalid players payload from Sleeper: %s", e)
+    if not data or not isinstance(data, dict):
+        return None
+    try:
+        # body is already valid JSON, write it as-is instead of re-serializing;
+        # write to a temp file and swap so readers never see a partial file
+        tmp = PLAYERS_FILE.with_suffix(".json.tmp")
+        tmp.write_bytes(raw)
+        os.replace(tmp, PLAYERS_FILE)
+    except Exception as e:
+        LOG.warning("Failed to write players cache: %s", e)
+    return data
 
 
-@alru_cache(maxsize=1, ttl=86400)
-async def get_players() -> Dict[str, Any]:
+async def _refresh_players_file() -> None:
+    """Background refresh of a stale players file; drops in-memory copies once it succeeds."""
+    global _players_refresh_task
+    try:
+        if await _download_players() is not None:
+            get_players.cache_clear()
+            get_players_display.cache_clear()
+    finally:
+        _players_refresh_task = None
+
+
+def _schedule_players_refresh() -> None:
+    global _players_refresh_task
+    if _players_refresh_task is None:
+        _players_refresh_task = asyncio.create_task(_refresh_players_file())
+
+
+async def _load_players() -> Dict[str, Any]:
     """
-    Return the players dict (player_id -> player info).
-    Uses file cache at .sleeper_cache/players_nfl.json if present; otherwise fetches.
-    Cached in-memory for 24h via alru_cache.
+    Load the players dict (player_id -> player info), uncached.
+    Uses file cache at .sleeper_cache/players_nfl.json if present (refreshed in the background
+    once older than PLAYERS_MAX_AGE); only blocks on the network when the file is missing.
     """
-    # if file exists, load and return
+    # if file exists, load and return (kicking off a refresh if it is stale)
     if PLAYERS_FILE.exists():
         try:
-            with PLAYERS_FILE.open("r", encoding="utf-8") as f:
-                data = json.load(f)
-                if isinstance(data, dict):
-                    return data
+            data = orjson.loads(PLAYERS_FILE.read_bytes())
+            if isinstance(data, dict):
+                if time.time() - PLAYERS_FILE.stat().st_mtime > PLAYERS_MAX_AGE:
+                    _schedule_players_refresh()
+                return data
         except Exception as e:
             LOG.warning("Failed to read players cache: %s", e)
 
     # otherwise fetch and save
-    async with httpx.AsyncClient() as client:
-        url = f"{BASE_URL}/players/nfl"
-        data = await _safe_get(client, url)
-        if not data:
-            LOG.warning("Could not fetch players from Sleeper; returning empty dict.")
-            return {}
-        try:
-            with PLAYERS_FILE.open("w", encoding="utf-8") as f:
-                json.dump(data, f)
-        except Exception as e:
-            LOG.warning("Failed to write players cache: %s", e)
-        return data
+    data = await _download_players()
+    if data is None:
+        LOG.warning("Could not fetch players from Sleeper; returning empty dict.")
+        return {}
+    return data
+
+
+@alru_cache(maxsize=1, ttl=86400)
+async def get_players() -> Dict[str, Any]:
+    """
+    Return the players dict (player_id -> player info).
+    Cached in-memory for 24h via alru_cache. The trade path uses get_players_display() instead,
+    so the full blob is only kept in memory if something asks for it.
+    """
+    return await _load_players()
+
+
+@alru_cache(maxsize=1, ttl=86400)
+async def get_players_display() -> Dict[str, str]:
+    """
+    Return player_id -> display name ("Full Name (POS TEAM)"), formatted once from the players blob.
+    Cached in-memory for 24h via alru_cache; the raw blob is dropped once formatted.
+    """
+    players = await _load_players()
+    return {pid: _format_player_name(p) for pid, p in players.items() if p and isinstance(p, dict)}
 
 
 @alru_cache(maxsize=1024, ttl=3600)
 async def get_user_by_username(username: str) -> Optional[Dict[str, Any]]:
     """Return the user object for a username (cached 1 hour)."""
-    async with httpx.AsyncClient() as client:
-        return await _safe_get(client, f"{BASE_URL}/user/{username}")
+    client = await get_client()
+    return await _safe_get(client, f"{BASE_URL}/user/{username}")
 
 
 @alru_cache(maxsize=1)
 async def get_current_season() -> int:
     """Return the current NFL season (tries /state/nfl)."""
-    async with httpx.AsyncClient() as client:
-        state = await _safe_get(client, f"{BASE_URL}/state/nfl")
-        if state:
-            # try a few keys
-            for k in ("league_season", "season", "year"):
-                if k in state:
-                    try:
-                        return int(state[k])
-                    except Exception:
-                        pass
+    client = await get_client()
+    state = await _safe_get(client, f"{BASE_URL}/state/nfl")
+    if state:
+        # try a few keys
+        for k in ("league_season", "season", "year"):
+            if k in state:
+                try:
+                    return int(state[k])
+                except Exception:
+                    pass
     # fallback to current year
     return datetime.utcnow().year
 
 
-async def _fetch_round_transactions(client: httpx.AsyncClient, league_id: str, r: int) -> List[Dict[str, Any]]:
+async def _fetch_round_transactions(client: httpx.AsyncClient, league_id: str, r: int,
+                                    type_filter: Optional[FrozenSet[Optional[str]]] = TRADE_TYPES) -> List[Dict[str, Any]]:
     url = f"{BASE_URL}/league/{league_id}/transactions/{r}"
     data = await _safe_get(client, url)
-    return data or []
+    if not data:
+        return []
+    # drop waivers / free agent moves right at the response boundary
+    if type_filter is not None:
+        return [tx for tx in data if tx.get("type") in type_filter]
+    return data
 
 
-async def _fetch_league_transactions(client: httpx.AsyncClient, league_id: str, rounds: Tuple[int, ...]) -> List[Dict[str, Any]]:
+async def _fetch_league_transactions(client: httpx.AsyncClient, league_id: str, rounds: Tuple[int, ...],
+                                     type_filter: Optional[FrozenSet[Optional[str]]] = TRADE_TYPES) -> List[Dict[str, Any]]:
     # fetch all requested rounds concurrently
     if not rounds:
         rounds = tuple(range(1, 19))
-    tasks = [_fetch_round_transactions(client, league_id, r) for r in rounds]
+    tasks = [_fetch_round_transactions(client, league_id, r, type_filter) for r in rounds]
     results = await asyncio.gather(*tasks)
     # flatten and deduplicate by transaction_id (if present)
     seen = set()
     out = []
     for lst in results:
         for tx in lst:
-            tid = tx.get("transaction_id") or json.dumps(tx, sort_keys=True)
+            tid = tx.get("transaction_id")
+            if not tid:
+                # no id: key on a fixed-size hash of the canonical payload instead of the blob itself
+                tid = hash(orjson.dumps(tx, option=orjson.OPT_SORT_KEYS))
             if tid in seen:
                 continue
             seen.add(tid)
@@ -164,33 +335,29 @@ def _str(x) -> str:
     return "" if x is None else str(x)
 
 
-def _roster_ids_for_user(rosters: List[Dict[str, Any]], user_id: str) -> List[str]:
-    """Return roster_id strings that belong to given user_id (best-effort)."""
-    user_id_s = _str(user_id)
-    out = []
-    for r in rosters:
-        owner = _str(r.get("owner_id") or r.get("user_id") or r.get("user"))
-        rid = _str(r.get("roster_id") or r.get("roster"))
-        # some APIs use integers, strings, or nested metadata; be flexible
-        if owner and owner == user_id_s:
-            out.append(rid)
-    return out
+def _roster_owner_map(rosters: List[Dict[str, Any]]) -> Dict[str, str]:
+    """Return roster_id -> owner user_id (both as strings, best-effort)."""
+    # some APIs use integers, strings, or nested metadata; be flexible
+    return {
+        _str(r.get("roster_id") or r.get("roster")): _str(r.get("owner_id") or r.get("user_id") or r.get("user"))
+        for r in rosters
+    }
+
+
+def _format_player_name(p: Dict[str, Any]) -> str:
+    # runs over every player up front, so tolerate null / non-string name fields
+    name = _str(p.get("full_name")) or (_str(p.get("first_name")) + " " + _str(p.get("last_name")))
+    pos = p.get("position") or ""
+    team = p.get("team") or ""
+    parts = [name.strip()]
+    if pos or team:
+        parts.append(f"({pos} {team})".strip())
+    return " ".join([part for part in parts if part])
 
 
-def _resolve_player_name(pid: str, players: Dict[str, Any]) -> str:
-    if not pid:
-        return "Unknown"
-    p = players.get(pid)
-    if p and isinstance(p, dict):
-        name = p.get("full_name") or (p.get("first_name", "") + " " + p.get("last_name", ""))
-        pos = p.get("position") or ""
-        team = p.get("team") or ""
-        parts = [name.strip()]
-        if pos or team:
-            parts.append(f"({pos} {team})".strip())
-        return " ".join([part for part in parts if part])
+def _resolve_player_name(pid: str, players_display: Dict[str, str]) -> str:
     # fallback: return id
-    return pid
+    return players_display.get(pid, pid or "Unknown")
 
 
 def _is_roster_match(value: Any, roster_ids: List[str]) -> bool:
@@ -201,16 +368,37 @@ def _is_roster_match(value: Any, roster_ids: List[str]) -> bool:
     return s in roster_ids
 
 
+def _tx_mentions_user(tx: Dict[str, Any], roster_to_owner: Dict[str, str], user_id: str) -> bool:
+    """Return True if the user created the tx or owns a roster named in its consenter / adds / drops fields."""
+    if _str(tx.get("creator")) == user_id:
+        return True
+    # these fields hold roster ids, not user ids
+    for rid in tx.get("consenter_ids") or ():
+        if roster_to_owner.get(_str(rid)) == user_id:
+            return True
+    for field in ("adds", "drops"):
+        mapping = tx.get(field)
+        if isinstance(mapping, dict):
+            for rid in mapping.values():
+                if roster_to_owner.get(_str(rid)) == user_id:
+                    return True
+    return False
+
+
 def _parse_transaction_for_user(tx: Dict[str, Any],
-                                user_roster_ids: List[str],
-                                players: Dict[str, Any],
+                                roster_to_owner: Dict[str, str],
+                                user_id: str,
+                                players_display: Dict[str, str],
                                 roster_map: Dict[str, str] = None) -> Dict[str, Any]:
     """
     Best-effort parse to determine assets_gained and assets_lost for user's roster(s).
     Returns dict: {'assets_gained': [...], 'assets_lost': [...]} (string descriptions).
     """
-    gained = []
-    lost = []
+    gained: List[str] = []
+    lost: List[str] = []
+    # keys (pick description or player id) already emitted, so each asset is listed once
+    gained_set: set = set()
+    lost_set: set = set()
 
     # Handle explicit traded_picks inside transaction if present
     for field in ("traded_picks", "draft_picks", "picks", "traded_pick"):
@@ -226,9 +414,11 @@ def _parse_transaction_for_user(tx: Dict[str, Any],
             original_owner = _str(pick.get("roster_id") or pick.get("previous_owner"))
             original_owner_name = roster_map.get(original_owner, f"roster {original_owner}") if original_owner else "origin unknown"
             desc = f"{pick.get('season', '')} R{pick.get('round', '?')} pick ({original_owner_name})".strip()
-            if owner and owner in user_roster_ids:
+            if owner and roster_to_owner.get(owner) == user_id and desc not in gained_set:
+                gained_set.add(desc)
                 gained.append(desc)
-            if prev and prev in user_roster_ids:
+            if prev and roster_to_owner.get(prev) == user_id and desc not in lost_set:
+                lost_set.add(desc)
                 lost.append(desc)
 
     # Normal player adds/drops mapping (player_id -> roster_id)
@@ -239,131 +429,253 @@ def _parse_transaction_for_user(tx: Dict[str, Any],
         for pid, rid in adds.items():
             if rid is None:
                 continue
-            if _str(rid) in user_roster_ids:
-                gained.append(_resolve_player_name(pid, players))
+            if roster_to_owner.get(_str(rid)) == user_id and pid not in gained_set:
+                gained_set.add(pid)
+                gained.append(_resolve_player_name(pid, players_display))
     if isinstance(drops, dict):
         for pid, rid in drops.items():
             if rid is None:
                 continue
             # Drops are often the roster_id that lost the player; if user's roster lost it, it's in lost
-            if _str(rid) in user_roster_ids:
-                lost.append(_resolve_player_name(pid, players))
+            if roster_to_owner.get(_str(rid)) == user_id and pid not in lost_set:
+                lost_set.add(pid)
+                lost.append(_resolve_player_name(pid, players_display))
 
     # Some trades list 'players' and a 'roster_ids' list but don't annotate who got what.
     # Best-effort: if user's roster_id appears in roster_ids, include all players as gained for that roster.
     if 'players' in tx and isinstance(tx.get('players'), list):
-        tx_roster_ids = [ _str(x) for x in (tx.get('roster_ids') or []) ]
-        for rid in user_roster_ids:
-            if rid in tx_roster_ids:
-                # add players but avoid duplicates
-                for pid in tx.get('players', []):
-                    name = _resolve_player_name(pid, players) if str(pid).isdigit() else str(pid)
-                    if name not in gained:
-                        gained.append(name)
-
-    # Final normalization: unique
-    gained = list(dict.fromkeys(gained))
-    lost = list(dict.fromkeys(lost))
+        if any(roster_to_owner.get(_str(x)) == user_id for x in tx.get('roster_ids') or ()):
+            # add players but avoid duplicates (check before resolving the name)
+            for pid in tx.get('players', []):
+                pid_key = str(pid)
+                if pid_key in gained_set:
+                    continue
+                gained_set.add(pid_key)
+                gained.append(_resolve_player_name(pid_key, players_display) if pid_key.isdigit() else pid_key)
 
     return {"assets_gained": gained, "assets_lost": lost, "raw": tx}
 
 
-@alru_cache(maxsize=128, ttl=60)
-async def gather_trades(username: str, season: Optional[int] = None, rounds: Optional[Tuple[int, ...]] = None) -> List[Dict[str, Any]]:
+class SWRCache:
     """
-    Async, cached aggregator. Returns list of trades (newest-first).
-    rounds must be a tuple of ints (hashable); if None defaults to 1..18.
+    Small async stale-while-revalidate cache.
+    Fresh hits return immediately; stale hits (up to max_stale seconds past ttl) return the old
+    value and refresh in the background; misses and anything older await the compute
+    (concurrent misses for the same key share one task).
     """
-    if season is None:
-        season = await get_current_season()
 
-    players = await get_players()
+    def __init__(self, ttl: float, max_stale: float, maxsize: int = 128):
+        self.ttl = ttl
+        self.max_stale = max_stale
+        self.maxsize = maxsize
+        self._entries: "OrderedDict[Hashable, Tuple[Any, float]]" = OrderedDict()
+        self._inflight: Dict[Hashable, asyncio.Task] = {}
+
+    async def get(self, key: Hashable, compute: Callable[[], Awaitable[Any]], allow_stale: bool = True) -> Any:
+        entry = self._entries.get(key)
+        if entry is not None:
+            value, expires_at = entry
+            now = time.monotonic()
+            # allow_stale=False: the caller awaits (or joins) the refresh once past ttl
+            serve_until = expires_at + self.max_stale if allow_stale else expires_at
+            if now < serve_until:
+                self._entries.move_to_end(key)
+                if now >= expires_at and key not in self._inflight:
+                    self._start(key, compute)
+                return value
+            if now >= expires_at + self.max_stale:
+                # too old to serve, even stale
+                del self._entries[key]
+        task = self._inflight.get(key) or self._start(key, compute)
+        return await asyncio.shield(task)
+
+    def _start(self, key: Hashable, compute: Callable[[], Awaitable[Any]]) -> asyncio.Task:
+        task = asyncio.create_task(self._run(key, compute))
+        # always retrieve the outcome: stale refreshes have no awaiter, and a miss's
+        # awaiter may be cancelled (client disconnect) while the shielded task keeps running
+        task.add_done_callback(self._log_task_error)
+        self._inflight[key] = task
+        return task
+
+    async def _run(self, key: Hashable, compute: Callable[[], Awaitable[Any]]) -> Any:
+        try:
+            value = await compute()
+            self._entries[key] = (value, time.monotonic() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+            return value
+        finally:
+            self._inflight.pop(key, None)
+
+    @staticmethod
+    def _log_task_error(task: asyncio.Task) -> None:
+        if not task.cancelled() and task.exception() is not None:
+            LOG.warning("Cache compute failed: %s", task.exception())
 
-    user = await get_user_by_username(username)
+
+# max_stale matches the stale-while-revalidate window webapp advertises on /trades
+_TRADES_CACHE = SWRCache(ttl=60, max_stale=120, maxsize=128)
+
+
+async def gather_trades(username: str, season: Optional[int] = None, rounds: Optional[Tuple[int, ...]] = None,
+                        allow_stale: bool = True) -> List[Dict[str, Any]]:
+    """
+    Async, cached aggregator. Returns list of trades (newest-first).
+    rounds must be a tuple of ints (hashable); if None defaults to 1..18.
+    Results are fresh for 60s, then served stale (for up to 120s more) while a background refresh runs;
+    pass allow_stale=False to wait for fresh data instead.
+    """
+    return await _TRADES_CACHE.get(
+        (username, season, rounds),
+        lambda: _gather_trades(username, season=season, rounds=rounds),
+        allow_stale=allow_stale,
+    )
+
+
+async def _gather_trades(username: str, season: Optional[int] = None, rounds: Optional[Tuple[int, ...]] = None) -> List[Dict[str, Any]]:
+    """Uncached body of gather_trades."""
+    # stage 1: season, players and user don't depend on each other, fetch concurrently
+    season_task = asyncio.create_task(get_current_season()) if season is None else None
+    players_task = asyncio.create_task(get_players_display())
+    user_task = asyncio.create_task(get_user_by_username(username))
+    await asyncio.gather(*[t for t in (season_task, players_task, user_task) if t is not None])
+
+    if season_task is not None:
+        season = season_task.result()
+    players_display = players_task.result()
+    user = user_task.result()
     if not user or "user_id" not in user:
         raise ValueError(f"user '{username}' not found")
 
     user_id = _str(user["user_id"])
 
-    async with httpx.AsyncClient() as client:
-        # fetch leagues for user
-        leagues = await _safe_get(client, f"{BASE_URL}/user/{user_id}/leagues/nfl/{season}") or []
-
-        # process each league concurrently
-        async def _process_league(league: Dict[str, Any]) -> List[Dict[str, Any]]:
-            lid = _str(league.get("league_id"))
-            league_name = league.get("name") or lid
-
-            # concurrently fetch transactions (multiple rounds), rosters, users, traded_picks
-            txs_task = _fetch_league_transactions(client, lid, rounds or tuple(range(1, 19)))
-            rosters_task = _fetch_rosters(client, lid)
-            users_task = _fetch_users(client, lid)
-            txs, rosters, users = await asyncio.gather(txs_task, rosters_task, users_task)
-
-            # map user_id -> display_name
-            user_map = {u["user_id"]: u.get("display_name") or u.get("username") for u in users}
-            # map roster_id -> username
-            roster_map = {
-                _str(r["roster_id"]): user_map.get(r.get("owner_id"), f"user {r.get('owner_id')}")
-                for r in rosters
-            }
-
-            rosters = rosters or []
-            users = users or []
-            txs = txs or []
-
-            # list roster ids belonging to user in this league
-            user_roster_ids = _roster_ids_for_user(rosters, user_id)
-
-            out = []
-            # parse transactions
-            for tx in txs:
-                # skip non-trades (we already filtered by type when fetching), but be safe
-                if tx.get("type") not in (None, "trade", "trade_proposal", "trade_transaction"):
-                    # skip other types (waiver etc.)
-                    continue
+    # stage 2: leagues need both season and user_id
+    client = await get_client()
+    # fetch leagues for user
+    leagues = await _safe_get(client, f"{BASE_URL}/user/{user_id}/leagues/nfl/{season}") or []
+
+    # process each league concurrently
+    async def _process_league(league: Dict[str, Any]) -> List[Dict[str, Any]]:
+        lid = _str(league.get("league_id"))
+        league_name = league.get("name") or lid
+
+        # concurrently fetch transactions (multiple rounds), rosters, users, traded_picks
+        txs_task = _fetch_league_transactions(client, lid, rounds or tuple(range(1, 19)))
+        rosters_task = _fetch_rosters(client, lid)
+        users_task = _fetch_users(client, lid)
+        txs, rosters, users = await asyncio.gather(txs_task, rosters_task, users_task)
+
+        # map user_id -> display_name
+        user_map = {u["user_id"]: u.get("display_name") or u.get("username") for u in users}
+        # map roster_id -> username
+        roster_map = {
+            _str(r["roster_id"]): user_map.get(r.get("owner_id"), f"user {r.get('owner_id')}")
+            for r in rosters
+        }
+
+        rosters = rosters or []
+        users = users or []
+        txs = txs or []
+
+        # map roster_id -> owner user_id once; involvement checks become dict probes
+        roster_to_owner = _roster_owner_map(rosters)
+
+        out = []
+        # parse transactions
+        for tx in txs:
+            # skip non-trades (we already filtered by type when fetching), but be safe
+            if tx.get("type") not in TRADE_TYPES:
+                # skip other types (waiver etc.)
+                continue
 
-                # detect involvement: roster_ids or traded_picks or user_id inside raw JSON
-                tx_roster_ids = [ _str(x) for x in (tx.get("roster_ids") or []) ]
-                involved = bool(set(user_roster_ids).intersection(set(tx_roster_ids)))
-                # fallback: check if user_id appears anywhere in JSON
-                if not involved:
-                    raw_str = json.dumps(tx)
-                    if user_id in raw_str:
-                        involved = True
+            # detect involvement: user's roster in roster_ids, else creator / consenter / adds / drops
+            involved = any(roster_to_owner.get(_str(x)) == user_id for x in tx.get("roster_ids") or ())
+            if not involved:
+                involved = _tx_mentions_user(tx, roster_to_owner, user_id)
 
-                if not involved:
-                    continue
+            if not involved:
+                continue
+
+            parsed = _parse_transaction_for_user(tx, roster_to_owner, user_id, players_display, roster_map)
+            # only include if there is some asset change
+            if parsed.get("assets_gained") or parsed.get("assets_lost"):
+                ts = tx.get("status_updated") or tx.get("created") or tx.get("updated_at")
+                # parse once; both the display date and the sort key come from the same ms value
+                ts_ms = _epoch_ms_from_maybe_ts(ts)
+                entry = {
+                    "league_id": lid,
+                    "league_name": league_name,
+                    "transaction_id": tx.get("transaction_id"),
+                    "date": _iso_from_ms(ts_ms, ts),
+                    "_sort_key": ts_ms or 0,
+                    "assets_gained": parsed.get("assets_gained", []),
+                    "assets_lost": parsed.get("assets_lost", []),
+                    "raw": parsed.get("raw"),
+                }
+                out.append(entry)
+
+        return out
+
+    # process leagues with bounded concurrency; if one fails the group cancels the rest
+    league_sem = asyncio.Semaphore(MAX_CONCURRENT_LEAGUES)
+    results: List[List[Dict[str, Any]]] = [[] for _ in leagues]
+
+    async def _run(i: int, league: Dict[str, Any]) -> None:
+        async with league_sem:
+            results[i] = await _process_league(league)
 
-                parsed = _parse_transaction_for_user(tx, user_roster_ids, players, roster_map)
-                # only include if there is some asset change
-                if parsed.get("assets_gained") or parsed.get("assets_lost"):
-                    entry = {
-                        "league_id": lid,
-                        "league_name": league_name,
-                        "transaction_id": tx.get("transaction_id"),
-                        "date": _iso_from_maybe_ts(tx.get("status_updated") or tx.get("created") or tx.get("updated_at")),
-                        "assets_gained": parsed.get("assets_gained", []),
-                        "assets_lost": parsed.get("assets_lost", []),
-                        "raw": parsed.get("raw"),
-                    }
-                    out.append(entry)
-
-            return out
-
-        # gather all leagues
-        tasks = [_process_league(league) for league in leagues]
-        results = await asyncio.gather(*tasks)
+    try:
+        async with asyncio.TaskGroup() as tg:
+            for i, league in enumerate(leagues):
+                tg.create_task(_run(i, league))
+    except* Exception as eg:
+        # unwrap so callers see the original exception (e.g. ValueError), as with asyncio.gather
+        raise eg.exceptions[0]
 
     # flatten results and sort newest-first
     all_trades = [t for chunk in results for t in chunk]
-    all_trades.sort(key=lambda x: x.get("date") or "", reverse=True)
+    all_trades.sort(key=itemgetter("_sort_key"), reverse=True)
+    for t in all_trades:
+        del t["_sort_key"]
     return all_trades
 
 
+# event loop reused by the sync wrapper so caches / the shared client survive between calls
+_LOOP: Optional[asyncio.AbstractEventLoop] = None
+
+
+def _close_loop() -> None:
+    if _LOOP is None or _LOOP.is_closed():
+        return
+    # cancel and drain leftover background work (cache / players refreshes) before closing
+    pending = asyncio.all_tasks(_LOOP)
+    for task in pending:
+        task.cancel()
+    if pending:
+        _LOOP.run_until_complete(asyncio.gather(*pending, return_exceptions=True))
+    _LOOP.run_until_complete(_LOOP.shutdown_asyncgens())
+    _LOOP.run_until_complete(close_client())
+    _LOOP.close()
+
+
+async def _gather_trades_sync(username: str, season: Optional[int], rounds: Optional[Tuple[int, ...]]) -> List[Dict[str, Any]]:
+    # the loop only runs during these calls, so background refreshes would never progress:
+    # wait for fresh trades and let any players refresh finish before handing control back
+    trades = await gather_trades(username, season=season, rounds=rounds, allow_stale=False)
+    if _players_refresh_task is not None:
+        await asyncio.shield(_players_refresh_task)
+    return trades
+
+
 def trades_for_user(username: str, season: Optional[int] = None, rounds: Optional[List[int]] = None) -> List[Dict[str, Any]]:
     """
     Sync wrapper for scripts / CLI. rounds can be a list of ints.
+    Runs on a persistent event loop (closed at exit) instead of a fresh asyncio.run per call.
     """
+    global _LOOP
+    if _LOOP is None:
+        _LOOP = asyncio.new_event_loop()
+        atexit.register(_close_loop)
     rounds_tuple = tuple(rounds) if rounds else None
-    return asyncio.run(gather_trades(username, season=season, rounds=rounds_tuple))
+    return _LOOP.run_until_complete(_gather_trades_sync(username, season, rounds_tuple))
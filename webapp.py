@@ -1,10 +1,13 @@
 # webapp.py
 from fastapi import FastAPI, Request, Query
-from fastapi.responses import HTMLResponse
+from fastapi.responses import HTMLResponse, Response
 from fastapi.templating import Jinja2Templates
 from pathlib import Path
 import sleeper_trades
+import hashlib
 import logging
+import orjson
+import re
 from datetime import datetime
 from typing import Optional
 
@@ -20,6 +23,25 @@ if Path("static").exists() and Path("static").is_dir():
 
 templates = Jinja2Templates(directory="templates")
 
+# browser caching for successful /trades pages
+TRADES_CACHE_CONTROL = "private, max-age=30, stale-while-revalidate=120"
+
+# "1,2, 3" style round lists
+_ROUNDS_RE = re.compile(r"\s*\d+\s*(?:,\s*\d+\s*)*")
+
+
+@app.on_event("startup")
+async def startup():
+    """Create the shared Sleeper HTTP client up front."""
+    await sleeper_trades.get_client()
+
+
+@app.on_event("shutdown")
+async def shutdown():
+    """Close the shared Sleeper HTTP client."""
+    await sleeper_trades.close_client()
+
+
 def format_date(value):
     """
     Safely format a date for Jinja2.
@@ -57,6 +79,18 @@ async def trades(
     Query trades for a username. Example:
     /trades?username=alice&season=2025&rounds=1,2,3
     """
+    # parse rounds into tuple of ints (or None); reject anything that isn't a list of numbers
+    # before doing any backend work
+    round_list = None
+    if rounds and not rounds.isspace():
+        if not _ROUNDS_RE.fullmatch(rounds):
+            context = {
+                "request": request, "username": username, "season": season, "rounds": rounds, "trades": [],
+                "error": f"Invalid rounds '{rounds}': expected comma-separated numbers like 1,2,3.",
+            }
+            return templates.TemplateResponse("index.html", context, status_code=400)
+        round_list = tuple(map(int, rounds.replace(" ", "").split(",")))
+
     if season:
         try:
             season = int(season.strip())
@@ -69,16 +103,10 @@ async def trades(
         except Exception:
             season = datetime.now().year  # fallback to current year dynamically
 
-    # parse rounds into tuple of ints (or None)
-    round_list = None
-    if rounds:
-        try:
-            round_list = tuple(int(r.strip()) for r in rounds.split(",") if r.strip().isdigit())
-        except Exception:
-            round_list = None
-
     context = {"request": request, "username": username, "season": season, "rounds": rounds}
 
+    etag = None
+
     try:
         # gather_trades expects rounds as a tuple (or None)
         trades = await sleeper_trades.gather_trades(username, season=season, rounds=round_list)
@@ -92,4 +120,17 @@ async def trades(
         context["trades"] = []
         context["error"] = "An error occurred while fetching trades. See logs."
 
-    return templates.TemplateResponse("index.html", context)
+    if context["error"] is None:
+        # same trades -> same page, so let browsers revalidate instead of re-downloading
+        try:
+            etag = '"' + hashlib.blake2b(orjson.dumps(context["trades"]), digest_size=8).hexdigest() + '"'
+        except Exception:
+            LOG.warning("Could not compute ETag for %s; serving without it", username)
+        if etag and request.headers.get("if-none-match") == etag:
+            return Response(status_code=304, headers={"ETag": etag, "Cache-Control": TRADES_CACHE_CONTROL})
+
+    response = templates.TemplateResponse("index.html", context)
+    if etag:
+        response.headers["ETag"] = etag
+        response.headers["Cache-Control"] = TRADES_CACHE_CONTROL
+    return response